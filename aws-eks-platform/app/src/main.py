@@ -4,99 +4,227 @@ Simple microservice with health checks and monitoring endpoints
 """
 
 import logging
+import logging.handlers
 import os
+import queue
+import sys
 import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Dict, Any
 
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import PlainTextResponse
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST,
+    GCCollector, PlatformCollector, ProcessCollector
+)
 import uvicorn
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
+class RestartableQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose start()/stop() are idempotent, so lifespan can run more than once"""
+    running = False
+
+    def start(self):
+        if not self.running:
+            super().start()
+            self.running = True
+
+    def stop(self):
+        if self.running:
+            super().stop()
+            self.running = False
+
+# Configure logging (drop INFO chatter in production)
+# Records are queued on the event loop and written to stderr by a background listener thread.
+# `python src/main.py` imports this module twice (as __main__, then as main:app for uvicorn),
+# so reuse the queue handler and its listener if the first import already installed them.
+# Only handlers carrying our listener count; a QueueHandler installed elsewhere is left alone.
+queue_handler = next(
+    (h for h in logging.getLogger().handlers
+     if isinstance(getattr(h, "listener", None), logging.handlers.QueueListener)),
+    None
 )
+if queue_handler is None:
+    # Added directly rather than via basicConfig, which does nothing if root already has handlers
+    queue_handler = logging.handlers.QueueHandler(queue.Queue(-1))
+    queue_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logging.getLogger().addHandler(queue_handler)
+    logging.getLogger().setLevel(
+        logging.WARNING if os.getenv("ENVIRONMENT") in ("production", "prod") else logging.INFO
+    )
+    queue_handler.listener = RestartableQueueListener(queue_handler.queue, logging.StreamHandler())
+    # Started at import so records logged before the server starts are written too
+    queue_handler.listener.start()
+log_listener = queue_handler.listener
 logger = logging.getLogger(__name__)
 
-# Prometheus metrics
+# Prometheus metrics, kept in a dedicated registry that /metrics renders.
+# The default process/platform/GC collectors are registered too so the exposed series stay the same.
+REG = CollectorRegistry(auto_describe=False)
+ProcessCollector(registry=REG)
+PlatformCollector(registry=REG)
+GCCollector(registry=REG)
+
 REQUEST_COUNT = Counter(
     'http_requests_total',
     'Total number of HTTP requests',
-    ['method', 'endpoint', 'status']
+    ['method', 'endpoint', 'status'],
+    registry=REG
 )
 
 REQUEST_DURATION = Histogram(
     'http_request_duration_seconds',
     'HTTP request duration in seconds',
-    ['method', 'endpoint']
+    ['method', 'endpoint'],
+    registry=REG
 )
 
 ERROR_COUNT = Counter(
     'http_errors_total',
     'Total number of HTTP errors',
-    ['method', 'endpoint', 'status']
+    ['method', 'endpoint', 'status'],
+    registry=REG
 )
 
+# Cached metric children so the label lookup happens once per label set
+@lru_cache(maxsize=4096)
+def _req_child(method: str, endpoint: str, status):
+    return REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status)
+
+@lru_cache(maxsize=4096)
+def _dur_child(method: str, endpoint: str):
+    return REQUEST_DURATION.labels(method=method, endpoint=endpoint)
+
+@lru_cache(maxsize=4096)
+def _err_child(method: str, endpoint: str, status):
+    return ERROR_COUNT.labels(method=method, endpoint=endpoint, status=status)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown handler"""
+    # No-op on the first startup; restarts the listener after a previous shutdown stopped it
+    log_listener.start()
+    logger.info("Application starting up...")
+    logger.info(f"Version: {app_state['version']}")
+    logger.info(f"Environment: {app_state['environment']}")
+    logger.info(f"Build ID: {app_state['build_id']}")
+    yield
+    logger.info("Application shutting down...")
+    # Flush queued log records before the process exits
+    log_listener.stop()
+
 # FastAPI app initialization
 app = FastAPI(
     title="EKS DevOps Demo API",
     description="A sample FastAPI microservice for EKS deployment demonstration",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Monotonic clock for elapsed-time math; time.time() is kept for epoch timestamps returned to clients
+_monotonic = time.monotonic
+
 # Application state
 app_state = {
     "startup_time": time.time(),
+    "startup_monotonic": _monotonic(),
     "version": os.getenv("APP_VERSION", "1.0.0"),
     "environment": os.getenv("ENVIRONMENT", "development"),
     "build_id": os.getenv("BUILD_ID", "unknown")
 }
 
+# Precomputed response content; only uptime varies per request
+ROOT_STATIC = {
+    "message": "Welcome to EKS DevOps Demo API",
+    "version": app_state["version"],
+    "environment": app_state["environment"],
+    "status": "healthy"
+}
+LIVENESS_RESPONSE = ORJSONResponse(content={"status": "alive"})
+READINESS_RESPONSE = ORJSONResponse(content={"status": "ready"})
+
+# Environment and runtime details for /info are read once at startup
+APP_INFO_STATIC = {
+    "application": {
+        "name": "EKS DevOps Demo API",
+        "version": app_state["version"],
+        "build_id": app_state["build_id"],
+        "environment": app_state["environment"]
+    },
+    "environment_variables": {
+        "ENVIRONMENT": os.getenv("ENVIRONMENT", "not_set"),
+        "APP_VERSION": os.getenv("APP_VERSION", "not_set"),
+        "BUILD_ID": os.getenv("BUILD_ID", "not_set"),
+        "DATABASE_URL": "***" if os.getenv("DATABASE_URL") else "not_set",
+        "API_KEY": "***" if os.getenv("API_KEY") else "not_set"
+    }
+}
+PYTHON_VERSION = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
+
+# Rendered /metrics output reused by scrapes that arrive within METRICS_CACHE_TTL seconds
+METRICS_CACHE_TTL = 0.5
+_metrics_cache = {"at": 0.0, "body": b""}
+
+# Largest request body /echo will buffer
+MAX_ECHO_BODY_BYTES = 1024 * 1024
+
+# Endpoint label for requests that matched no route, so 404 scans can't grow the label space
+UNMATCHED_ENDPOINT = "unmatched"
+
+def _route_template(request: Request) -> str:
+    """Return the matched route pattern, or a fixed label for unmatched routes"""
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    # Plain Starlette routes (/docs, /redoc, /openapi.json) only record the matched endpoint
+    endpoint = request.scope.get("endpoint")
+    if endpoint is not None:
+        for candidate in request.app.router.routes:
+            if getattr(candidate, "endpoint", None) is endpoint:
+                return candidate.path
+    return UNMATCHED_ENDPOINT
+
 @app.middleware("http")
 async def prometheus_middleware(request: Request, call_next):
     """Middleware to collect Prometheus metrics for all requests"""
-    start_time = time.time()
+    start_time = _monotonic()
     method = request.method
-    path = request.url.path
     
     try:
         response = await call_next(request)
         status_code = response.status_code
+        # Label by route template so /hello/{name} stays a single series
+        endpoint = _route_template(request)
         
-        # Record metrics
-        REQUEST_COUNT.labels(method=method, endpoint=path, status=status_code).inc()
-        REQUEST_DURATION.labels(method=method, endpoint=path).observe(time.time() - start_time)
+        # Record metrics; each child is resolved once per request
+        _req_child(method, endpoint, status_code).inc()
+        _dur_child(method, endpoint).observe(_monotonic() - start_time)
         
         if status_code >= 400:
-            ERROR_COUNT.labels(method=method, endpoint=path, status=status_code).inc()
+            _err_child(method, endpoint, status_code).inc()
             
         return response
         
     except Exception as e:
         # Record error metrics
-        ERROR_COUNT.labels(method=method, endpoint=path, status="500").inc()
-        REQUEST_COUNT.labels(method=method, endpoint=path, status="500").inc()
-        logger.error(f"Request failed: {method} {path} - {str(e)}")
+        endpoint = _route_template(request)
+        _err_child(method, endpoint, 500).inc()
+        _req_child(method, endpoint, 500).inc()
+        logger.error(f"Request failed: {method} {request.url.path} - {str(e)}")
         raise
 
 @app.get("/")
-async def root() -> Dict[str, Any]:
+async def root() -> ORJSONResponse:
     """Root endpoint with basic application information"""
     logger.info("Root endpoint accessed")
-    return {
-        "message": "Welcome to EKS DevOps Demo API",
-        "version": app_state["version"],
-        "environment": app_state["environment"],
-        "status": "healthy",
-        "uptime_seconds": round(time.time() - app_state["startup_time"], 2)
-    }
+    return ORJSONResponse(content={
+        **ROOT_STATIC,
+        "uptime_seconds": round(_monotonic() - app_state["startup_monotonic"], 2)
+    })
 
 @app.get("/health")
 async def health_check() -> Dict[str, Any]:
@@ -105,7 +233,7 @@ async def health_check() -> Dict[str, Any]:
     
     # Simple health check logic
     current_time = time.time()
-    uptime = current_time - app_state["startup_time"]
+    uptime = _monotonic() - app_state["startup_monotonic"]
     
     health_status = {
         "status": "healthy",
@@ -123,13 +251,13 @@ async def health_check() -> Dict[str, Any]:
     return health_status
 
 @app.get("/health/live")
-async def liveness_probe() -> Dict[str, str]:
+async def liveness_probe() -> ORJSONResponse:
     """Kubernetes liveness probe endpoint"""
     logger.debug("Liveness probe accessed")
-    return {"status": "alive"}
+    return LIVENESS_RESPONSE
 
 @app.get("/health/ready")
-async def readiness_probe() -> Dict[str, str]:
+async def readiness_probe() -> ORJSONResponse:
     """Kubernetes readiness probe endpoint"""
     logger.debug("Readiness probe accessed")
     
@@ -137,39 +265,33 @@ async def readiness_probe() -> Dict[str, str]:
     # In a real application, you would check database connections,
     # external services, etc.
     
-    return {"status": "ready"}
+    return READINESS_RESPONSE
 
-@app.get("/metrics", response_class=PlainTextResponse)
-async def metrics() -> str:
+@app.get("/metrics")
+async def metrics() -> Response:
     """Prometheus metrics endpoint"""
     logger.debug("Metrics endpoint accessed")
-    return generate_latest()
+    now = _monotonic()
+    if now - _metrics_cache["at"] > METRICS_CACHE_TTL:
+        _metrics_cache["body"] = generate_latest(REG)
+        _metrics_cache["at"] = now
+    # Set the header directly: Starlette appends a second charset to text/* media types
+    return Response(content=_metrics_cache["body"], headers={"Content-Type": CONTENT_TYPE_LATEST})
 
 @app.get("/info")
-async def app_info() -> Dict[str, Any]:
+async def app_info() -> ORJSONResponse:
     """Application information endpoint"""
     logger.info("Info endpoint accessed")
     
-    return {
-        "application": {
-            "name": "EKS DevOps Demo API",
-            "version": app_state["version"],
-            "build_id": app_state["build_id"],
-            "environment": app_state["environment"]
-        },
+    return ORJSONResponse(content={
+        "application": APP_INFO_STATIC["application"],
         "runtime": {
             "startup_time": app_state["startup_time"],
-            "uptime_seconds": round(time.time() - app_state["startup_time"], 2),
-            "python_version": f"{os.sys.version_info.major}.{os.sys.version_info.minor}.{os.sys.version_info.micro}"
+            "uptime_seconds": round(_monotonic() - app_state["startup_monotonic"], 2),
+            "python_version": PYTHON_VERSION
         },
-        "environment_variables": {
-            "ENVIRONMENT": os.getenv("ENVIRONMENT", "not_set"),
-            "APP_VERSION": os.getenv("APP_VERSION", "not_set"),
-            "BUILD_ID": os.getenv("BUILD_ID", "not_set"),
-            "DATABASE_URL": "***" if os.getenv("DATABASE_URL") else "not_set",
-            "API_KEY": "***" if os.getenv("API_KEY") else "not_set"
-        }
-    }
+        "environment_variables": APP_INFO_STATIC["environment_variables"]
+    })
 
 @app.get("/hello/{name}")
 async def hello_name(name: str) -> Dict[str, str]:
@@ -193,39 +315,37 @@ async def test_error():
     raise HTTPException(status_code=500, detail="This is a test error for monitoring purposes")
 
 @app.post("/echo")
-async def echo_post(request: Request) -> Dict[str, Any]:
+async def echo_post(request: Request) -> ORJSONResponse:
     """Echo endpoint that returns request information"""
     logger.info("Echo endpoint accessed")
     
-    body = await request.body()
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_ECHO_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Request body too large")
     
-    return {
+    # Enforce the limit while streaming too, for chunked bodies without a content-length
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_ECHO_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Request body too large")
+    
+    # Header and query pairs are serialized by orjson directly, without an intermediate dict
+    return ORJSONResponse(content={
         "method": request.method,
         "url": str(request.url),
-        "headers": dict(request.headers),
+        "headers": list(request.headers.items()),
         "body": body.decode() if body else None,
-        "query_params": dict(request.query_params),
+        "query_params": request.query_params.multi_items(),
         "timestamp": time.time()
-    }
-
-@app.on_event("startup")
-async def startup_event():
-    """Application startup event handler"""
-    logger.info("Application starting up...")
-    logger.info(f"Version: {app_state['version']}")
-    logger.info(f"Environment: {app_state['environment']}")
-    logger.info(f"Build ID: {app_state['build_id']}")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Application shutdown event handler"""
-    logger.info("Application shutting down...")
+    })
 
 if __name__ == "__main__":
     # Get configuration from environment variables
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
     log_level = os.getenv("LOG_LEVEL", "info").lower()
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
     
     logger.info(f"Starting server on {host}:{port}")
     
@@ -235,5 +355,10 @@ if __name__ == "__main__":
         port=port,
         log_level=log_level,
         reload=False,
-        access_log=True
+        # Request logging is covered by the Prometheus middleware
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+        # Require the fast implementations instead of silently falling back to asyncio/h11
+        loop="uvloop",
+        http="httptools",
+        workers=workers
     )
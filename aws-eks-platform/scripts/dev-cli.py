@@ -5,12 +5,27 @@ Provides utilities for log tailing and Helm rollbacks across environments
 """
 
 import argparse
+import asyncio
+import heapq
 import json
+import os
 import subprocess
 import sys
 import time
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from collections import namedtuple
+from typing import List, Optional, Dict, Any, Iterator
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    json_loads = json.loads
+
+# Last kubeconfig context set by update_kubeconfig, with the kubeconfig mtime at that point
+KUBE_CTX_CACHE = os.path.expanduser("~/.cache/devops-cli/kube-ctx")
+
+# Fields of a pod that the CLI actually uses
+Pod = namedtuple("Pod", "name phase")
 
 
 class Colors:
@@ -29,6 +44,14 @@ class Colors:
 class DevOpsCLI:
     """Main CLI class for DevOps operations"""
     
+    # Colors per log level, built once instead of on every log() call
+    LEVEL_COLORS = {
+        "INFO": Colors.BLUE,
+        "SUCCESS": Colors.GREEN,
+        "WARNING": Colors.YELLOW,
+        "ERROR": Colors.RED
+    }
+    
     def __init__(self):
         self.app_name = "sample-app"
         self.valid_environments = ["dev", "stage", "prod"]
@@ -37,15 +60,9 @@ class DevOpsCLI:
     
     def log(self, message: str, level: str = "INFO") -> None:
         """Print formatted log message"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        color_map = {
-            "INFO": Colors.BLUE,
-            "SUCCESS": Colors.GREEN,
-            "WARNING": Colors.YELLOW,
-            "ERROR": Colors.RED
-        }
-        color = color_map.get(level, Colors.WHITE)
-        print(f"{color}[{timestamp}] {level}: {message}{Colors.RESET}")
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        color = self.LEVEL_COLORS.get(level, Colors.WHITE)
+        sys.stdout.write(f"{color}[{timestamp}] {level}: {message}{Colors.RESET}\n")
     
     def run_command(self, command: List[str], capture_output: bool = False) -> Optional[str]:
         """Execute shell command and return output"""
@@ -56,7 +73,8 @@ class DevOpsCLI:
                 return result.stdout.strip()
             else:
                 subprocess.run(command, check=True)
-                return None
+                # Empty string rather than None so callers can tell success from failure
+                return ""
         except subprocess.CalledProcessError as e:
             self.log(f"Command failed: {e}", "ERROR")
             if capture_output and e.stdout:
@@ -68,6 +86,47 @@ class DevOpsCLI:
             self.log(f"Command not found: {command[0]}", "ERROR")
             return None
     
+    async def run_command_async(self, command: List[str]) -> Optional[str]:
+        """Execute shell command without blocking the event loop and return its output"""
+        self.log(f"Executing: {' '.join(command)}")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            self.log(f"Command not found: {command[0]}", "ERROR")
+            return None
+        
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            self.log(f"Command failed with exit code {process.returncode}: {' '.join(command)}", "ERROR")
+            if stdout:
+                self.log(f"Output: {stdout.decode()}", "ERROR")
+            if stderr:
+                self.log(f"Error: {stderr.decode()}", "ERROR")
+            return None
+        return stdout.decode().strip()
+    
+    def run_command_stream(self, command: List[str]) -> Iterator[str]:
+        """Execute shell command and yield its stdout line by line"""
+        self.log(f"Executing: {' '.join(command)}")
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=1, text=True)
+        except FileNotFoundError:
+            self.log(f"Command not found: {command[0]}", "ERROR")
+            return
+        
+        try:
+            for line in process.stdout:
+                yield line
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.terminate()
+            return_code = process.wait()
+            if return_code > 0:
+                self.log(f"Command failed with exit code {return_code}", "ERROR")
+    
     def validate_environment(self, environment: str) -> bool:
         """Validate environment name"""
         if environment not in self.valid_environments:
@@ -75,18 +134,70 @@ class DevOpsCLI:
             return False
         return True
     
+    def kubeconfig_mtime(self) -> Optional[int]:
+        """Return the modification time of the active kubeconfig file, if it exists"""
+        path = os.environ.get("KUBECONFIG", "~/.kube/config").split(os.pathsep)[0]
+        try:
+            return os.stat(os.path.expanduser(path)).st_mtime_ns
+        except OSError:
+            return None
+    
+    def current_context(self) -> Optional[str]:
+        """Return the current kubectl context without logging when none is set"""
+        try:
+            result = subprocess.run(
+                ["kubectl", "config", "current-context"], capture_output=True, text=True
+            )
+        except FileNotFoundError:
+            return None
+        return result.stdout.strip() if result.returncode == 0 else None
+    
     def update_kubeconfig(self, environment: str) -> bool:
         """Update kubeconfig for the specified environment"""
         cluster_name = f"{self.cluster_prefix}-{environment}"
+        # aws eks update-kubeconfig names the context after the cluster ARN
+        context_prefix = f"arn:aws:eks:{self.region}:"
+        context_suffix = f":cluster/{cluster_name}"
+        
+        # Skip the AWS API call if the kubeconfig is unchanged since we last pointed it at this cluster,
+        # or if kubectl already reports this cluster as the current context
+        try:
+            with open(KUBE_CTX_CACHE) as f:
+                cached_context, cached_mtime = f.read().split()
+        except (OSError, ValueError):
+            cached_context, cached_mtime = None, None
+        
+        mtime = self.kubeconfig_mtime()
+        if cached_context and cached_mtime == str(mtime):
+            context = cached_context
+        else:
+            context = self.current_context()
+        
+        if context and context.startswith(context_prefix) and context.endswith(context_suffix):
+            self.log(f"Kubeconfig already using context {context}")
+            return True
+        
         command = [
             "aws", "eks", "update-kubeconfig",
             "--region", self.region,
             "--name", cluster_name
         ]
-        return self.run_command(command) is not None
+        if self.run_command(command) is None:
+            return False
+        
+        context = self.current_context()
+        mtime = self.kubeconfig_mtime()
+        if context and mtime is not None:
+            try:
+                os.makedirs(os.path.dirname(KUBE_CTX_CACHE), exist_ok=True)
+                with open(KUBE_CTX_CACHE, "w") as f:
+                    f.write(f"{context} {mtime}\n")
+            except OSError as e:
+                self.log(f"Could not write kubeconfig context cache: {e}", "WARNING")
+        return True
     
-    def get_pods(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
-        """Get list of application pods"""
+    def get_pods(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Pod]]:
+        """Get application pod names and phases, projected by kubectl via jsonpath"""
         if namespace is None:
             namespace = environment
         
@@ -94,17 +205,13 @@ class DevOpsCLI:
             "kubectl", "get", "pods",
             "-n", namespace,
             "-l", f"app.kubernetes.io/name={self.app_name}",
-            "-o", "json"
+            "-o", r'jsonpath={range .items[*]}{.metadata.name}{"\t"}{.status.phase}{"\n"}{end}'
         ]
         
         output = self.run_command(command, capture_output=True)
-        if output:
-            try:
-                data = json.loads(output)
-                return data.get("items", [])
-            except json.JSONDecodeError:
-                self.log("Failed to parse pod information", "ERROR")
-        return None
+        if output is None:
+            return None
+        return [Pod(*line.split("\t", 1)) for line in output.splitlines() if "\t" in line]
     
     def tail_logs(self, environment: str, follow: bool = False, lines: int = 100, 
                   pod_name: Optional[str] = None, namespace: Optional[str] = None) -> None:
@@ -129,18 +236,17 @@ class DevOpsCLI:
                 return
             
             if len(pods) == 1:
-                pod_name = pods[0]["metadata"]["name"]
+                pod_name = pods[0].name
                 self.log(f"Using pod: {pod_name}", "INFO")
             else:
                 self.log("Multiple pods found:", "INFO")
                 for i, pod in enumerate(pods):
-                    status = pod["status"]["phase"]
-                    self.log(f"  {i}: {pod['metadata']['name']} ({status})")
+                    self.log(f"  {i}: {pod.name} ({pod.phase})")
                 
                 try:
                     choice = int(input(f"{Colors.CYAN}Select pod (0-{len(pods)-1}): {Colors.RESET}"))
                     if 0 <= choice < len(pods):
-                        pod_name = pods[choice]["metadata"]["name"]
+                        pod_name = pods[choice].name
                     else:
                         self.log("Invalid selection", "ERROR")
                         return
@@ -157,9 +263,12 @@ class DevOpsCLI:
         self.log(f"Press Ctrl+C to stop", "INFO")
         
         try:
-            # For following logs, don't capture output
-            if follow:
-                subprocess.run(command)
+            # Stream followed or large tails instead of buffering them in memory
+            if follow or lines > 1000:
+                for line in self.run_command_stream(command):
+                    sys.stdout.write(line)
+                    if follow:
+                        sys.stdout.flush()
             else:
                 output = self.run_command(command, capture_output=True)
                 if output:
@@ -167,38 +276,38 @@ class DevOpsCLI:
         except KeyboardInterrupt:
             self.log("Log tailing stopped", "INFO")
     
-    def get_helm_releases(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    async def get_helm_releases(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
         """Get Helm releases for the environment"""
         if namespace is None:
             namespace = environment
         
         command = ["helm", "list", "-n", namespace, "-o", "json"]
-        output = self.run_command(command, capture_output=True)
+        output = await self.run_command_async(command)
         
         if output:
             try:
-                return json.loads(output)
+                return json_loads(output)
             except json.JSONDecodeError:
                 self.log("Failed to parse Helm releases", "ERROR")
         return None
     
-    def get_helm_history(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    async def get_helm_history(self, environment: str, namespace: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
         """Get Helm release history"""
         if namespace is None:
             namespace = environment
         
         command = ["helm", "history", self.app_name, "-n", namespace, "-o", "json"]
-        output = self.run_command(command, capture_output=True)
+        output = await self.run_command_async(command)
         
         if output:
             try:
-                return json.loads(output)
+                return json_loads(output)
             except json.JSONDecodeError:
                 self.log("Failed to parse Helm history", "ERROR")
         return None
     
-    def rollback_release(self, environment: str, revision: Optional[int] = None, 
-                        confirm: bool = False, namespace: Optional[str] = None) -> None:
+    async def rollback_release_async(self, environment: str, revision: Optional[int] = None, 
+                                     confirm: bool = False, namespace: Optional[str] = None) -> None:
         """Rollback Helm release to previous or specific revision"""
         if not self.validate_environment(environment):
             return
@@ -212,17 +321,16 @@ class DevOpsCLI:
         if not self.update_kubeconfig(environment):
             return
         
-        # Get current release information
-        releases = self.get_helm_releases(environment, namespace)
+        # Get current release information and history concurrently
+        releases, history = await asyncio.gather(
+            self.get_helm_releases(environment, namespace),
+            self.get_helm_history(environment, namespace)
+        )
         if not releases:
             self.log("No Helm releases found", "ERROR")
             return
         
-        app_release = None
-        for release in releases:
-            if release["name"] == self.app_name:
-                app_release = release
-                break
+        app_release = next((r for r in releases if r["name"] == self.app_name), None)
         
         if not app_release:
             self.log(f"Helm release '{self.app_name}' not found", "ERROR")
@@ -231,12 +339,12 @@ class DevOpsCLI:
         current_revision = app_release["revision"]
         self.log(f"Current revision: {current_revision}")
         
-        # Get history
-        history = self.get_helm_history(environment, namespace)
         if not history:
             self.log("Could not get release history", "ERROR")
             return
         
+        history_by_rev = {h["revision"]: h for h in history}
+        
         if len(history) < 2 and revision is None:
             self.log("No previous revisions available for rollback", "ERROR")
             return
@@ -244,24 +352,23 @@ class DevOpsCLI:
         # Determine target revision
         if revision is None:
             # Find previous revision
-            sorted_history = sorted(history, key=lambda x: x["revision"], reverse=True)
-            if len(sorted_history) >= 2:
-                target_revision = sorted_history[1]["revision"]
+            latest_two = heapq.nlargest(2, history_by_rev)
+            if len(latest_two) >= 2:
+                target_revision = latest_two[1]
             else:
                 self.log("No previous revision found", "ERROR")
                 return
         else:
             target_revision = revision
             # Validate revision exists
-            valid_revisions = [h["revision"] for h in history]
-            if target_revision not in valid_revisions:
-                self.log(f"Revision {target_revision} not found. Available: {valid_revisions}", "ERROR")
+            if target_revision not in history_by_rev:
+                self.log(f"Revision {target_revision} not found. Available: {list(history_by_rev)}", "ERROR")
                 return
         
         self.log(f"Target revision: {target_revision}")
         
         # Show rollback details
-        target_history = next((h for h in history if h["revision"] == target_revision), None)
+        target_history = history_by_rev.get(target_revision)
         if target_history:
             self.log(f"Rolling back to: {target_history['description']}")
             self.log(f"Updated: {target_history['updated']}")
@@ -299,9 +406,7 @@ class DevOpsCLI:
                 if pods:
                     self.log("Current pods:")
                     for pod in pods:
-                        name = pod["metadata"]["name"]
-                        status = pod["status"]["phase"]
-                        self.log(f"  {name}: {status}")
+                        self.log(f"  {pod.name}: {pod.phase}")
             else:
                 self.log("Rollback may have failed - check deployment status", "WARNING")
         else:
@@ -378,12 +483,12 @@ Examples:
                 namespace=args.namespace
             )
         elif args.command == "rollback":
-            cli.rollback_release(
+            asyncio.run(cli.rollback_release_async(
                 environment=args.environment,
                 revision=args.revision,
                 confirm=args.confirm,
                 namespace=args.namespace
-            )
+            ))
     except KeyboardInterrupt:
         print(f"\n{Colors.YELLOW}Operation interrupted{Colors.RESET}")
     except Exception as e: